@@ -2,14 +2,14 @@
 import asyncio
 import socket
 import time
-from typing import cast
 
 from aiohttp import web
 from zeroconf.asyncio import ServiceInfo
 
 from homeassistant import config_entries, core
-from homeassistant.auth.providers.homeassistant import HassAuthProvider
 from homeassistant.components import zeroconf
+from homeassistant.components.network import async_get_source_ip
+from homeassistant.components.network.const import MDNS_TARGET_IP
 from homeassistant.const import CONF_NAME, CONF_PORT
 from homeassistant.helpers import instance_id
 from homeassistant.helpers.entityfilter import (
@@ -21,6 +21,11 @@ from .blgwserver import BLGWServer, CustomBasicAuth
 from .const import CONF_INCLUDE_EXCLUDE_MODE, CONF_SERIAL_NUMBER, DOMAIN
 from .hipserver import HIPServer
 
+BLGW_ROUTES = (
+    ("GET", "/blgwpservices.json", "blgwpservices"),
+    ("GET", "/a/view/House/{zone}/CAMERA/{camera_name}/mjpeg", "camera_mjpeg"),
+)
+
 
 async def async_setup_entry( hass: core.HomeAssistant, entry: config_entries.ConfigEntry) -> bool:
     """Set up BeoLink from a config entry."""
@@ -29,11 +34,13 @@ async def async_setup_entry( hass: core.HomeAssistant, entry: config_entries.Con
     loop = asyncio.get_running_loop()
     hipserver = await loop.create_server(lambda: HIPServer(entry.options[CONF_INCLUDE_ENTITIES],entry.options[CONF_EXCLUDE_ENTITIES],entry.options[CONF_INCLUDE_EXCLUDE_MODE],hass), None, 9100)
 
-    providers = hass.auth.auth_providers
-    auth = CustomBasicAuth(cast(HassAuthProvider, providers))
+    auth = CustomBasicAuth(hass.auth.auth_providers)
     server = BLGWServer(entry.options[CONF_NAME],entry.options[CONF_SERIAL_NUMBER],entry.options[CONF_INCLUDE_ENTITIES],entry.options[CONF_EXCLUDE_ENTITIES],entry.options[CONF_INCLUDE_EXCLUDE_MODE], hass)
+    entry.async_on_unload(server.close)
     app = web.Application(middlewares=[auth])
-    app.router.add_routes( [web.get('/blgwpservices.json', server.blgwpservices),web.get('/a/view/House/{zone}/CAMERA/{camera_name}/mjpeg', server.camera_mjpeg)] )
+    app.router.add_routes(
+        [web.route(method, path, getattr(server, handler)) for method, path, handler in BLGW_ROUTES]
+    )
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite( runner, None, entry.options.get( CONF_PORT, 80))
@@ -41,9 +48,11 @@ async def async_setup_entry( hass: core.HomeAssistant, entry: config_entries.Con
 
     hass.data[DOMAIN][entry.entry_id] = {'BLGWServer' : site, 'HIPServer' : hipserver}
 
-    zeroconf_instance = await zeroconf.async_get_instance(hass)
-
-    uuid = await instance_id.async_get(hass)
+    zeroconf_instance, uuid, local_address = await asyncio.gather(
+        zeroconf.async_get_instance(hass),
+        instance_id.async_get(hass),
+        async_get_source_ip(hass, target_ip=MDNS_TARGET_IP),
+    )
 
     desc = {
         "hipport": "9100",
@@ -55,8 +64,6 @@ async def async_setup_entry( hass: core.HomeAssistant, entry: config_entries.Con
         "timestamp": int(time.time()),
     }
 
-    local_address = get_local_address()
-
     info = ServiceInfo(
         "_hipservices._tcp.local.",
         "BLGW (blgw) | "+entry.options[CONF_NAME]+"._hipservices._tcp.local.",
@@ -84,18 +91,3 @@ async def async_unload_entry(hass: core.HomeAssistant, entry: config_entries.Con
     hipserver : HIPServer = hass.data[DOMAIN][entry.entry_id]['HIPServer']
     hipserver.close()
     return True
-
-def get_local_address() -> str:
-    """Grabs the local IP address using a socket.
-
-    :return: Local IP Address in IPv4 format.
-    :rtype: str
-    """
-    # TODO: try not to talk 8888 for this
-    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    try:
-        s.connect(("8.8.8.8", 80))
-        addr = s.getsockname()[0]
-    finally:
-        s.close()
-    return str(addr)
@@ -1,10 +1,17 @@
 """Module for returning data formatted in json."""
+import asyncio
+import hashlib
+from ipaddress import ip_address
 import json
 import logging
+from operator import attrgetter, itemgetter
+import secrets
+import time
+from types import MappingProxyType
 
-from aiohttp import MultipartWriter, web
+from aiohttp import web
+from aiohttp.helpers import ETAG_ANY
 from aiohttp_basicauth import BasicAuthMiddleware
-import jsonpickle
 
 from homeassistant import core
 from homeassistant.auth.providers.homeassistant import (
@@ -12,6 +19,10 @@ from homeassistant.auth.providers.homeassistant import (
     HassAuthProvider,
     InvalidAuth,
 )
+from homeassistant.auth.providers.trusted_networks import (
+    InvalidAuthError,
+    TrustedNetworksAuthProvider,
+)
 from homeassistant.components.alarm_control_panel import DOMAIN as ALARM_DOMAIN
 from homeassistant.components.camera import DOMAIN as CAMERA_DOMAIN
 from homeassistant.components.climate import DOMAIN as CLIMATE_DOMAIN
@@ -22,32 +33,172 @@ from homeassistant.components.light import (
     color_supported,
 )
 from homeassistant.components.media_player import DOMAIN as MEDIA_PLAYER_DOMAIN
-from homeassistant.const import ATTR_SUPPORTED_FEATURES
-from homeassistant.helpers import area_registry as ar, device_registry as dr
+from homeassistant.const import (
+    ATTR_FRIENDLY_NAME,
+    ATTR_RESTORED,
+    ATTR_SUPPORTED_FEATURES,
+    EVENT_STATE_CHANGED,
+)
+from homeassistant.core import CALLBACK_TYPE, Event, State, callback, split_entity_id
+from homeassistant.helpers import (
+    area_registry as ar,
+    device_registry as dr,
+    entity_registry as er,
+)
+from homeassistant.helpers.event import EventStateChangedData
+from homeassistant.helpers.json import json_bytes
+from homeassistant.helpers.typing import EventType
 
 from .const import MODE_EXCLUDE, MODE_INCLUDE
 from .model.blgwpwebservices import Area, Zone, blgwpwebservices
 
 _LOGGER = logging.getLogger(__name__)
 
+RESOURCE_DOMAINS = frozenset(
+    {
+        COVER_DOMAIN,
+        LIGHT_DOMAIN,
+        CAMERA_DOMAIN,
+        CLIMATE_DOMAIN,
+        ALARM_DOMAIN,
+        MEDIA_PLAYER_DOMAIN,
+    }
+)
+
+# State attributes that decide what blgwpservices.json contains; changes to
+# any other attribute (brightness, media position, ...) leave the body
+# unchanged. Restored placeholder states written at startup carry the
+# registry's name and capabilities but have no entity yet, so they are
+# skipped; the restored flag going away is what signals the entity loaded.
+_PAYLOAD_ATTRIBUTES = (
+    ATTR_FRIENDLY_NAME,
+    ATTR_RESTORED,
+    ATTR_SUPPORTED_FEATURES,
+    ATTR_SUPPORTED_COLOR_MODES,
+)
+
+_SHADE_COMMANDS = ("LOWER", "RAISE", "STOP")
+_SHADE_POSITION_COMMANDS = ("LOWER", "RAISE", "STOP", "SET")
+_SHADE_POSITION_STATES = ("LEVEL",)
+_DIMMER_COMMANDS = ("SET",)
+_DIMMER_STATES = ("LEVEL",)
+_DIMMER_COLOR_COMMANDS = ("SET", "SET COLOR")
+_DIMMER_COLOR_STATES = ("LEVEL", "COLOR")
+_THERMOSTAT_COMMANDS = ("SET SETPOINT", "SET MODE", "SET FAN AUTO")
+_THERMOSTAT_STATES = ("TEMPERATURE", "SETPOINT", "MODE", "FAN AUTO", "VALUE")
+_THERMOSTAT_EVENTS = ("STATE_UPDATE",)
+_ALARM_COMMANDS = ("ARM", "DISARM")
+_ALARM_STATES = ("ALARM", "MODE", "READY")
+_MEDIA_PLAYER_COMMANDS = (
+    "All standby",
+    "Beo4 advanced command",
+    "Beo4 command",
+    "BeoRemote One Source Selection",
+    "BeoRemote One command",
+    "Channel selection",
+    "Cinema mode",
+    "Master volume adjust",
+    "Master volume level",
+    "Picture Mute",
+    "Picture mode",
+    "Playqueue add Deezer playlist",
+    "Playqueue add TuneIn station",
+    "Playqueue add URL",
+    "Playqueue clean",
+    "Recall profile",
+    "Save profile",
+    "Select channel",
+    "Select source",
+    "Select source by id",
+    "Send command",
+    "Send digit",
+    "Sound mode",
+    "Speaker group",
+    "Stand position",
+    "Standby",
+    "Volume adjust",
+    "Volume level",
+)
+_MEDIA_PLAYER_EVENTS = ("All standby", "Control", "Light")
+_MEDIA_PLAYER_STATES = (
+    "nowPlaying",
+    "nowPlayingDetails",
+    "online",
+    "sourceName",
+    "sourceUniqueId",
+    "state",
+    "volume",
+)
+AUTH_CACHE_TTL = 60
+AUTH_CACHE_SIZE = 256
+SOURCES_CACHE_TTL = 30
+RESPONSE_CACHE_TTL = 30
+
+_MJPEG_BOUNDARY = "myboundary"
+_MJPEG_HEADERS = MappingProxyType(
+    {"Content-Type": f"multipart/x-mixed-replace; boundary={_MJPEG_BOUNDARY}"}
+)
+_MJPEG_FRAME_HEADER = (
+    f"--{_MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n".encode()
+    + b"Content-Length: %d\r\n\r\n"
+)
+
 class CustomBasicAuth(BasicAuthMiddleware):
     """Class for handlig authentication against Home Assistant users."""
 
     def __init__(self, providers: list[AuthProvider]) -> None:
         """Init CustomBasicAuth."""
         self.providers = providers
+        self._trusted_networks: TrustedNetworksAuthProvider | None = next(
+            (p for p in providers if isinstance(p, TrustedNetworksAuthProvider)),
+            None,
+        )
+        self._hass_auth: HassAuthProvider | None = next(
+            (p for p in providers if isinstance(p, HassAuthProvider)), None
+        )
+        self._auth_cache: dict[bytes, float] = {}
+        self._auth_cache_salt = secrets.token_bytes(16)
         super().__init__()
 
+    def _auth_cache_key(self, username: str, password: str) -> bytes:
+        """Return a salted digest identifying a set of credentials."""
+        return hashlib.blake2b(
+            f"{len(username)}:{username}:{password}".encode(), key=self._auth_cache_salt
+        ).digest()
+
+    def _is_trusted(self, request: web.Request) -> bool:
+        """Return True if the client is on a trusted network."""
+        if self._trusted_networks is None or not request.remote:
+            return False
+        try:
+            self._trusted_networks.async_validate_access(ip_address(request.remote))
+        except (InvalidAuthError, ValueError):
+            return False
+        return True
+
+    async def authenticate(self, request):
+        """Accept trusted clients before the Authorization header is parsed."""
+        if self._is_trusted(request):
+            return True
+        return await super().authenticate(request)
+
     async def check_credentials(self, username, password, request):
-        """Check ip / credentials against Home Assistant."""
-        for provider in self.providers:
-            if isinstance (provider, HassAuthProvider):
-                try:
-                    await provider.async_validate_login(username, password)
-                except InvalidAuth:
-                    return False
-                return True
-        return False
+        """Check credentials against Home Assistant."""
+        if self._hass_auth is None:
+            return False
+        key = self._auth_cache_key(username, password)
+        expires = self._auth_cache.get(key)
+        if expires is not None and expires > time.monotonic():
+            return True
+        try:
+            await self._hass_auth.async_validate_login(username, password)
+        except InvalidAuth:
+            self._auth_cache.pop(key, None)
+            return False
+        if len(self._auth_cache) >= AUTH_CACHE_SIZE:
+            del self._auth_cache[next(iter(self._auth_cache))]
+        self._auth_cache[key] = time.monotonic() + AUTH_CACHE_TTL
+        return True
 
 
 class BLGWServer:
@@ -57,257 +208,410 @@ class BLGWServer:
         """Init BLGWServer."""
         self.name = name
         self.serial_number = serial_number
-        self.include_entities = include_entities
-        self.exclude_entities = exclude_entities
+        self.include_entities = frozenset(include_entities)
+        self.exclude_entities = frozenset(exclude_entities)
         self.include_exclude_mode = include_exclude_mode
         self.hass = hass
+        self._cached_body: bytes | None = None
+        self._cached_etag: str | None = None
+        self._cache_dirty = True
+        self._cache_expires = 0.0
+        self._build_lock = asyncio.Lock()
+        self._camera_by_name: dict[str, str] | None = None
+        self._sources_cache: dict[str, tuple[float, list]] = {}
+        self._subscriptions: list[CALLBACK_TYPE] = [
+            hass.bus.async_listen(
+                EVENT_STATE_CHANGED,
+                self._async_state_changed,
+                event_filter=_async_resource_state_filter,
+            ),
+            hass.bus.async_listen(
+                ar.EVENT_AREA_REGISTRY_UPDATED, self._async_invalidate_cache
+            ),
+            hass.bus.async_listen(
+                dr.EVENT_DEVICE_REGISTRY_UPDATED, self._async_invalidate_cache
+            ),
+            hass.bus.async_listen(
+                er.EVENT_ENTITY_REGISTRY_UPDATED, self._async_invalidate_cache
+            ),
+        ]
+
+    @callback
+    def _async_invalidate_cache(self, event: Event) -> None:
+        """Mark the cached blgwpservices.json response as stale."""
+        self._cache_dirty = True
+
+    @callback
+    def _async_state_changed(self, event: EventType[EventStateChangedData]) -> None:
+        """Invalidate the caches when a state change alters the BeoLink output."""
+        old_state = event.data["old_state"]
+        new_state = event.data["new_state"]
+        if old_state is None or new_state is None:
+            # The entity was added or removed.
+            name_changed = True
+        else:
+            old_attributes = old_state.attributes
+            new_attributes = new_state.attributes
+            if all(
+                old_attributes.get(attribute) == new_attributes.get(attribute)
+                for attribute in _PAYLOAD_ATTRIBUTES
+            ):
+                return
+            name_changed = old_state.name != new_state.name
+        self._cache_dirty = True
+        if (
+            name_changed
+            and split_entity_id(event.data["entity_id"])[0] == CAMERA_DOMAIN
+        ):
+            self._camera_by_name = None
+
+    def close(self) -> None:
+        """Unsubscribe cache invalidation listeners."""
+        while len(self._subscriptions) > 0:
+            self._subscriptions.pop()()
 
     async def camera_mjpeg(self, request):
         """Handle a mjpeg stream."""
-        boundary = "myboundary"
+        if self._camera_by_name is None:
+            self._camera_by_name = {
+                state.name: state.entity_id
+                for state in self.hass.states.async_all(CAMERA_DOMAIN)
+            }
+        entity_id = self._camera_by_name.get(request.match_info["camera_name"])
+        if entity_id is None:
+            raise web.HTTPNotFound()
+        camera = self.hass.data[CAMERA_DOMAIN].get_entity(entity_id)
+        if camera is None:
+            raise web.HTTPNotFound()
+
         response = web.StreamResponse(
-            status=200,
-            reason="OK",
-            headers={
-                "Content-Type": "multipart/x-mixed-replace; " "boundary=%s" % boundary,
-            },
+            status=200, reason="OK", headers=_MJPEG_HEADERS
         )
         await response.prepare(request)
-        states = self.hass.states.async_all()
-        camera_state = next(
-            x
-            for x in states
-            if x.attributes["friendly_name"] == request.match_info["camera_name"]
-        )
-        camera = self.hass.data["camera"].get_entity(camera_state.entity_id)
 
-        while True:
-            image_cb = await camera.async_camera_image()
-            with MultipartWriter("image/jpeg", boundary=boundary) as mpwriter:
-                mpwriter.append(image_cb, {"Content-Type": "image/jpeg"})
-                await mpwriter.write(response, close_boundary=False)
-            await response.drain()
+        frame_interval = camera.frame_interval
+        get_image = camera.async_camera_image
+        write = response.write
+        try:
+            while True:
+                image_cb = await get_image()
+                if image_cb is not None:
+                    await write(_MJPEG_FRAME_HEADER % len(image_cb))
+                    await write(image_cb)
+                    await write(b"\r\n")
+                await asyncio.sleep(frame_interval)
+        except ConnectionResetError:
+            _LOGGER.debug("MJPEG client for %s disconnected", entity_id)
+        return response
+
+    def _cache_is_fresh(self) -> bool:
+        """Return True if the cached blgwpservices.json body can be served."""
+        # BeoPlay source lists change without any HA event, so the body
+        # is also rebuilt once it is older than the TTL.
+        return (
+            not self._cache_dirty
+            and self._cached_body is not None
+            and self._cache_expires > time.monotonic()
+        )
 
     async def blgwpservices(self, request):
         """Handle the blgwpservices.json request."""
-        dr_reg = dr.async_get(self.hass)
-        area_reg = ar.async_get(self.hass)
-        bl_areas: dict[str, Area] = {}
+        # While a rebuild runs the cached body is already known to be stale,
+        # so wait for the rebuild instead of serving it.
+        if not self._build_lock.locked() and self._cache_is_fresh():
+            return self._cached_response(request)
+        async with self._build_lock:
+            # Another request may have rebuilt the body while this one waited.
+            if not self._cache_is_fresh():
+                # Clear the flag before building so changes arriving while the
+                # beoplay sources are awaited mark the new body stale again.
+                self._cache_dirty = False
+                try:
+                    await self._async_rebuild_cache()
+                except BaseException:
+                    self._cache_dirty = True
+                    raise
+        return self._cached_response(request)
+
+    async def _async_rebuild_cache(self) -> None:
+        """Rebuild the cached blgwpservices.json body and its ETag."""
+        area_by_device = {
+            device.id: device.area_id
+            for device in dr.async_get(self.hass).devices.values()
+        }
+        area_name_by_id = {
+            area.id: area.name for area in ar.async_get(self.hass).async_list_areas()
+        }
+        components = {domain: self.hass.data.get(domain) for domain in RESOURCE_DOMAINS}
         bl_zones: dict[str, Zone] = {}
         bl_ressources: dict[str, dict[str, object]] = {}
+        media_players: list[tuple[dict[str, object], object, str]] = []
+
+        if self.include_exclude_mode == MODE_INCLUDE:
+            # The include list is usually far shorter than the state machine;
+            # states of other domains have no entry in components below.
+            states = [
+                state
+                for entity_id in self.include_entities
+                if (state := self.hass.states.get(entity_id)) is not None
+            ]
+        else:
+            states = self.hass.states.async_all(RESOURCE_DOMAINS)
 
-        states = self.hass.states.async_all()
         for state in states:
-            if state.domain in {
-                COVER_DOMAIN,
-                LIGHT_DOMAIN,
-                CAMERA_DOMAIN,
-                CLIMATE_DOMAIN,
-                ALARM_DOMAIN,
-                MEDIA_PLAYER_DOMAIN,
-            }:
-                if( self.include_exclude_mode == MODE_INCLUDE and state.entity_id not in self.include_entities ):
-                    continue
-                if( self.include_exclude_mode == MODE_EXCLUDE and state.entity_id in self.exclude_entities ):
-                    continue
-                domain = self.hass.data.get(state.domain)
-                if( domain is None):
-                    continue
-                entity = domain.get_entity(state.entity_id)
-                if entity is None or entity.registry_entry is None:
+            if( self.include_exclude_mode == MODE_EXCLUDE and state.entity_id in self.exclude_entities ):
+                continue
+            component = components.get(state.domain)
+            if component is None:
+                continue
+            entity = component.get_entity(state.entity_id)
+            if entity is None or entity.registry_entry is None:
+                continue
+            name = state.name
+            if name is None:
+                message = f"Entity {entity.entity_id} has no entity name"
+                _LOGGER.info( message )
+                continue
+            if "?" in name or "/" in name:
+                message = f"Entity {name} contains illegal character (? or /) for BeoLink usage"
+                _LOGGER.info( message )
+                continue
+            area_id = entity.registry_entry.area_id or area_by_device.get(
+                entity.registry_entry.device_id
+            )
+            if area_id is None:
+                continue
+            resources = bl_ressources.get(area_id)
+            if resources is None:
+                area_name = area_name_by_id.get(area_id)
+                if area_name is None:
                     continue
-                if state.name is None:
-                    message = f"Entity {entity.entity_id} has no entity name"
-                    _LOGGER.info( message )
-                    continue
-                if "?" in state.name or "/" in state.name:
-                    message = f"Entity {state.name} contains illegal character (? or /) for BeoLink usage"
-                    _LOGGER.info( message )
-                    continue
-                area_id = entity.registry_entry.area_id
-                if area_id is None:
-                    device = dr_reg.async_get(entity.registry_entry.device_id)
-                    if device is None:
-                        continue
-                    area_id = device.area_id
-                    if area_id is None:
-                        continue
-                if area_id not in bl_zones:
-                    area = area_reg.async_get_area(area_id)
-                    if area is None:
-                        continue
-                    bl_zones[area_id] = Zone(area.name, "house", False, False, {})
-                    bl_ressources[area_id] = {}
-                if state.domain == COVER_DOMAIN:
-                    commands = ["LOWER", "RAISE", "STOP"]
-                    states = []
-                    if (
-                        state.attributes.get(ATTR_SUPPORTED_FEATURES, 0)
-                        & CoverEntityFeature.SET_POSITION
-                    ):
-                        commands.append("SET")
-                        states.append("LEVEL")
-                    shade = {
-                        "type": "SHADE",
-                        "name": state.name,
-                        "id": entity.entity_id,
-                        "systemAddress": "HomeAssistant",
-                        "hide": False,
-                        "commands": commands,
-                        "states": states,
-                        "events": [],
-                    }
-                    bl_ressources[area_id][state.entity_id] = shade
-                if state.domain == LIGHT_DOMAIN:
-                    dimmer = {
-                        "type": "DIMMER",
-                        "name": state.name,
-                        "id": entity.entity_id,
-                        "systemAddress": "HomeAssistant",
-                        "hide": False,
-                        "commands": ["SET"],
-                        "states": ["LEVEL"],
-                    }
-                    color_modes = (state.attributes.get(ATTR_SUPPORTED_COLOR_MODES) or [])
-                    if( color_supported(color_modes) ):
-                        dimmer['commands'].append("SET COLOR")
-                        dimmer['states'].append("COLOR")
-                    bl_ressources[area_id][state.entity_id] = dimmer
-                if state.domain == CAMERA_DOMAIN:
-                    camera = {
-                        "type": "CAMERA",
-                        "name": state.name,
-                        "rtspSupport": False,
-                        "commands": [],
-                    }
-                    bl_ressources[area_id][state.entity_id] = camera
-                if state.domain == "climate":
-                    thermostate = {
-                        "type": "THERMOSTAT_1SP",
-                        "name": state.name,
-                        "id": entity.entity_id,
-                        "systemAddress": "HomeAssistant",
-                        "hide": False,
-                        "commands": ["SET SETPOINT", "SET MODE", "SET FAN AUTO"],
-                        "states": [
-                            "TEMPERATURE",
-                            "SETPOINT",
-                            "MODE",
-                            "FAN AUTO",
-                            "VALUE",
-                        ],
-                        "events": ["STATE_UPDATE"],
-                    }
-                    bl_ressources[area_id][state.entity_id] = thermostate
-                if state.domain == ALARM_DOMAIN:
-                    alarm = {
-                        "type": "ALARM",
-                        "name": state.name,
-                        "id": entity.entity_id,
-                        "systemAddress": "HomeAssistant",
-                        "hide": False,
-                        "commands": ["ARM", "DISARM"],
-                        "states": ["ALARM", "MODE", "READY"],
-                        "events": [],
-                    }
-                    bl_ressources[area_id][state.entity_id] = alarm
-                if state.domain == MEDIA_PLAYER_DOMAIN and entity.platform.platform_name == "beoplay":
-                    sources = await entity._speaker.async_getReq("BeoZone/Zone/Sources")
-                    bl_sources = []
-                    if sources:
-                        try:
-                            for source in sources['sources']:
-                                if 1 in source and "id" in source[1]:
-                                    bl_source = {
-                                        "name": source[1]["friendlyName"],
-                                        "uiType": "0.2",
-                                        "code": "HDMI",
-                                        "format": "F0",
-                                        "networkBit": False,
-                                        "select": {
-                                            "cmds": [
-                                                "Select source by id?"+source[1]["id"]
-                                            ]
-                                        },
-                                        "sourceId": source[1]["id"],
-                                        "sourceType": source[1]["sourceType"]["type"],
-                                        "profiles": "",
-                                    }
-                                    bl_sources.append(bl_source)
-                        except Exception as err:
-                            error_text = f"Problems handling sources for entity: {entity.name}. Sources: {json.dumps(sources)}. Error: {err}"
-                            _LOGGER.exception(error_text)
-                    media_player = {
-                        "type": "AV renderer",
-                        "name": state.name,
-                        "id": entity.entity_id,
-                        "systemAddress": "HomeAssistant",
-                        "hide": False,
-                        "commands": [
-                            "All standby",
-                            "Beo4 advanced command",
-                            "Beo4 command",
-                            "BeoRemote One Source Selection",
-                            "BeoRemote One command",
-                            "Channel selection",
-                            "Cinema mode",
-                            "Master volume adjust",
-                            "Master volume level",
-                            "Picture Mute",
-                            "Picture mode",
-                            "Playqueue add Deezer playlist",
-                            "Playqueue add TuneIn station",
-                            "Playqueue add URL",
-                            "Playqueue clean",
-                            "Recall profile",
-                            "Save profile",
-                            "Select channel",
-                            "Select source",
-                            "Select source by id",
-                            "Send command",
-                            "Send digit",
-                            "Sound mode",
-                            "Speaker group",
-                            "Stand position",
-                            "Standby",
-                            "Volume adjust",
-                            "Volume level",
-                        ],
-                        "events": ["All standby", "Control", "Light"],
-                        "states": [
-                            "nowPlaying",
-                            "nowPlayingDetails",
-                            "online",
-                            "sourceName",
-                            "sourceUniqueId",
-                            "state",
-                            "volume",
-                        ],
-                        "Beo4NavButton": True,
-                        "sn": entity._serial_number,
-                        "sources": bl_sources,
-                        "playQueueCapabilities": "deezer,dlna",
-                        "integratedRole": "none",
-                        "integratedSN": "",
-                    }
-                    bl_ressources[area_id][state.entity_id] = media_player
+                bl_zones[area_id] = Zone(area_name, "house", False, False, {})
+                resources = bl_ressources[area_id] = {}
+            if state.domain == MEDIA_PLAYER_DOMAIN:
+                if entity.platform.platform_name == "beoplay":
+                    media_players.append((resources, entity, name))
+                continue
+            resources[state.entity_id] = _RESOURCE_BUILDERS[state.domain](
+                state, entity, name
+            )
+
+        # Query the BeoPlay speakers concurrently rather than one at a time.
+        media_player_resources = await asyncio.gather(
+            *(
+                self._async_build_media_player(entity, name)
+                for _, entity, name in media_players
+            )
+        )
+        for (resources, entity, _), resource in zip(
+            media_players, media_player_resources
+        ):
+            resources[entity.entity_id] = resource
+
+        body = await self.hass.async_add_executor_job(
+            self._build_response_bytes, bl_zones, bl_ressources
+        )
+        self._cached_body = body
+        self._cached_etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+        self._cache_expires = time.monotonic() + RESPONSE_CACHE_TTL
+
+    def _cached_response(self, request) -> web.Response:
+        """Return the cached body, or 304 if the client already has it."""
+        # If-None-Match uses the weak comparison, so W/ tags match too.
+        if_none_match = request.if_none_match
+        if if_none_match and any(
+            etag.value in (self._cached_etag, ETAG_ANY) for etag in if_none_match
+        ):
+            response = web.Response(status=304)
+        else:
+            response = web.Response(
+                body=self._cached_body, content_type="application/json"
+            )
+        response.etag = self._cached_etag
+        return response
 
+    def _build_response_bytes(
+        self,
+        bl_zones: dict[str, Zone],
+        bl_ressources: dict[str, dict[str, object]],
+    ) -> bytes:
+        """Sort the collected zones and encode blgwpservices.json.
+
+        Runs in the executor; the zones and resources are built for this
+        request only, so nothing else touches them meanwhile.
+        """
         for bl_zone_key, bl_zone in bl_zones.items():
-            sorted_resources = list(bl_ressources[bl_zone_key].values())
-            sorted_resources.sort(key=lambda x: x.get("name"))
-            bl_zone.resources = sorted_resources
+            bl_zone.resources = sorted(
+                bl_ressources[bl_zone_key].values(), key=itemgetter("name")
+            )
+
+        house_area = Area("House", sorted(bl_zones.values(), key=attrgetter("name")))
+        main_area = Area("Main", [Zone("global", "house", True, False, [])])
+
+        data = blgwpwebservices(
+            project=self.name, sn=self.serial_number, areas=[house_area, main_area]
+        )
+
+        # json_bytes is HA's orjson encoder; it serializes the model
+        # dataclasses natively, in field order.
+        return json_bytes(data)
+
+    async def _async_build_media_player(self, entity, name: str) -> dict:
+        """Build an AV renderer resource for a BeoPlay media player."""
+        media_player = {
+            "type": "AV renderer",
+            "name": name,
+            "id": entity.entity_id,
+            "systemAddress": "HomeAssistant",
+            "hide": False,
+            "commands": _MEDIA_PLAYER_COMMANDS,
+            "events": _MEDIA_PLAYER_EVENTS,
+            "states": _MEDIA_PLAYER_STATES,
+            "Beo4NavButton": True,
+            "sn": entity._serial_number,
+            "sources": await self._async_get_sources(entity),
+            "playQueueCapabilities": "deezer,dlna",
+            "integratedRole": "none",
+            "integratedSN": "",
+        }
+        return media_player
+
+    async def _async_get_sources(self, entity) -> list:
+        """Return the BeoLink sources of a BeoPlay speaker, cached for a while."""
+        cached = self._sources_cache.get(entity.entity_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        bl_sources = []
+        # All speakers are queried in one gather; an unreachable speaker must
+        # not fail the whole blgwpservices rebuild. Failures are not cached.
+        try:
+            sources = await entity._speaker.async_getReq("BeoZone/Zone/Sources")
+        except Exception as err:
+            _LOGGER.warning(
+                "Unable to fetch sources for entity: %s. Error: %s", entity.name, err
+            )
+            return bl_sources
+        if sources:
+            try:
+                for source in sources['sources']:
+                    if 1 in source and "id" in source[1]:
+                        bl_source = {
+                            "name": source[1]["friendlyName"],
+                            "uiType": "0.2",
+                            "code": "HDMI",
+                            "format": "F0",
+                            "networkBit": False,
+                            "select": {
+                                "cmds": [
+                                    "Select source by id?"+source[1]["id"]
+                                ]
+                            },
+                            "sourceId": source[1]["id"],
+                            "sourceType": source[1]["sourceType"]["type"],
+                            "profiles": "",
+                        }
+                        bl_sources.append(bl_source)
+            except Exception as err:
+                error_text = f"Problems handling sources for entity: {entity.name}. Sources: {json.dumps(sources)}. Error: {err}"
+                _LOGGER.exception(error_text)
+            else:
+                self._sources_cache[entity.entity_id] = (
+                    time.monotonic() + SOURCES_CACHE_TTL,
+                    bl_sources,
+                )
+        return bl_sources
+
+
+@callback
+def _async_resource_state_filter(event: EventType[EventStateChangedData]) -> bool:
+    """Only pass on state changes of the BeoLink resource domains."""
+    return split_entity_id(event.data["entity_id"])[0] in RESOURCE_DOMAINS
+
+
+def _build_shade(state: State, entity, name: str) -> dict:
+    """Build a shade resource for a cover."""
+    commands = _SHADE_COMMANDS
+    states = ()
+    if (
+        state.attributes.get(ATTR_SUPPORTED_FEATURES, 0)
+        & CoverEntityFeature.SET_POSITION
+    ):
+        commands = _SHADE_POSITION_COMMANDS
+        states = _SHADE_POSITION_STATES
+    return {
+        "type": "SHADE",
+        "name": name,
+        "id": entity.entity_id,
+        "systemAddress": "HomeAssistant",
+        "hide": False,
+        "commands": commands,
+        "states": states,
+        "events": (),
+    }
+
+
+def _build_dimmer(state: State, entity, name: str) -> dict:
+    """Build a dimmer resource for a light."""
+    color_modes = (state.attributes.get(ATTR_SUPPORTED_COLOR_MODES) or [])
+    if( color_supported(color_modes) ):
+        commands = _DIMMER_COLOR_COMMANDS
+        states = _DIMMER_COLOR_STATES
+    else:
+        commands = _DIMMER_COMMANDS
+        states = _DIMMER_STATES
+    return {
+        "type": "DIMMER",
+        "name": name,
+        "id": entity.entity_id,
+        "systemAddress": "HomeAssistant",
+        "hide": False,
+        "commands": commands,
+        "states": states,
+    }
+
+
+def _build_camera(state: State, entity, name: str) -> dict:
+    """Build a camera resource."""
+    return {
+        "type": "CAMERA",
+        "name": name,
+        "rtspSupport": False,
+        "commands": (),
+    }
+
+
+def _build_thermostat(state: State, entity, name: str) -> dict:
+    """Build a thermostat resource for a climate entity."""
+    return {
+        "type": "THERMOSTAT_1SP",
+        "name": name,
+        "id": entity.entity_id,
+        "systemAddress": "HomeAssistant",
+        "hide": False,
+        "commands": _THERMOSTAT_COMMANDS,
+        "states": _THERMOSTAT_STATES,
+        "events": _THERMOSTAT_EVENTS,
+    }
 
-        house_area = Area("House")
-        sorted_zones = list(bl_zones.values())
-        sorted_zones.sort(key=lambda x: x.name)
-        house_area.zones = sorted_zones
-        bl_areas["House"] = house_area
 
-        main_zone = Zone("global", "house", True, False, [])
-        main_area = Area("Main")
-        main_area.zones = {main_zone}
-        bl_areas["main"] = main_area
+def _build_alarm(state: State, entity, name: str) -> dict:
+    """Build an alarm resource for an alarm control panel."""
+    return {
+        "type": "ALARM",
+        "name": name,
+        "id": entity.entity_id,
+        "systemAddress": "HomeAssistant",
+        "hide": False,
+        "commands": _ALARM_COMMANDS,
+        "states": _ALARM_STATES,
+        "events": (),
+    }
 
-        data = blgwpwebservices(self.name, self.serial_number, list(bl_areas.values()))
 
-        return web.Response(body=jsonpickle.encode(data, unpicklable=False))
+_RESOURCE_BUILDERS = {
+    COVER_DOMAIN: _build_shade,
+    LIGHT_DOMAIN: _build_dimmer,
+    CAMERA_DOMAIN: _build_camera,
+    CLIMATE_DOMAIN: _build_thermostat,
+    ALARM_DOMAIN: _build_alarm,
+}
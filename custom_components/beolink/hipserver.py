@@ -91,6 +91,30 @@ REMOTE_MAPPING = { "BACK" : "Cursor/Back",
                 "WIND" : "Stream/Forward"
                 }
 
+SHADE_SERVICES = {
+    "RAISE": SERVICE_OPEN_COVER,
+    "LOWER": SERVICE_CLOSE_COVER,
+    "STOP": SERVICE_STOP_COVER,
+}
+
+HIP_DOMAINS = frozenset(
+    {
+        COVER_DOMAIN,
+        LIGHT_DOMAIN,
+        CLIMATE_DOMAIN,
+        ALARM_DOMAIN,
+        MEDIA_PLAYER_DOMAIN,
+    }
+)
+
+HIP_TYPES = {
+    CLIMATE_DOMAIN: "THERMOSTAT_1SP",
+    LIGHT_DOMAIN: "DIMMER",
+    COVER_DOMAIN: "SHADE",
+    ALARM_DOMAIN: "ALARM",
+    MEDIA_PLAYER_DOMAIN: "AV renderer",
+}
+
 _LOGGER = logging.getLogger(__name__)
 
 class HIPRessource:
@@ -104,16 +128,8 @@ class HIPRessource:
         self.entity_name = entity_name
         self.area_name = area_name
         self.features = features
-        if self.domain == CLIMATE_DOMAIN:
-            self.hip_type = "THERMOSTAT_1SP"
-        elif self.domain == LIGHT_DOMAIN:
-            self.hip_type = "DIMMER"
-        elif self.domain == COVER_DOMAIN:
-            self.hip_type = "SHADE"
-        elif self.domain == ALARM_DOMAIN:
-            self.hip_type = "ALARM"
-        elif self.domain == MEDIA_PLAYER_DOMAIN:
-            self.hip_type = "AV renderer"
+        self.hip_type = HIP_TYPES[self.domain]
+        if self.domain == MEDIA_PLAYER_DOMAIN:
             self.product_id = None
             if entity.platform.platform_name == "beoplay":
                 self.product_id = entity._type_number + "."+ entity._item_number+ "." + entity._serial_number + "@products.bang-olufsen.com"
@@ -209,8 +225,8 @@ class HIPServer(asyncio.Protocol):
     def __init__(self, include_entities : str, exclude_entities : str, include_exclude_mode : str, hass: core.HomeAssistant) -> None:
         """Init HIPServer."""
 
-        self.include_entities = include_entities
-        self.exclude_entities = exclude_entities
+        self.include_entities = frozenset(include_entities)
+        self.exclude_entities = frozenset(exclude_entities)
         self.include_exclude_mode = include_exclude_mode
         self.hass = hass
         self.providers = self.hass.auth.auth_providers
@@ -288,68 +304,61 @@ class HIPServer(asyncio.Protocol):
                     )
                 if line in ("q */*/*/*", "q"):
                     self.send_ok_line("q */*/*/*")
-                    states = self.hass.states.async_all()
-
-                    dr_reg = dr.async_get(self.hass)
-                    area_reg = ar.async_get(self.hass)
-                    for state in states:
-                        if state.domain in {
-                            COVER_DOMAIN,
-                            LIGHT_DOMAIN,
-                            CLIMATE_DOMAIN,
-                            ALARM_DOMAIN,
-                            MEDIA_PLAYER_DOMAIN,
-                        }:
-                            if( self.include_exclude_mode == MODE_INCLUDE and state.entity_id not in self.include_entities ):
-                                continue
-                            if( self.include_exclude_mode == MODE_EXCLUDE and state.entity_id in self.exclude_entities ):
-                                continue
-                            if "?" in state.name or "/" in state.name:
-                                message = f"Entity {state.name} contains illegal character (? or /) for BeoLink usage"
-                                _LOGGER.info( message )
-                                continue
-                            domain = self.hass.data.get(state.domain)
-                            if( domain is None):
-                                continue
-                            entity = domain.get_entity(
-                                state.entity_id
-                            )
-                            if entity is None or entity.registry_entry is None:
-                                continue
-                            area_id = entity.registry_entry.area_id
-                            if area_id is None:
-                                device = dr_reg.async_get(
-                                    entity.registry_entry.device_id
-                                )
-                                if device is None:
-                                    continue
-                                area_id = device.area_id
-                                if area_id is None:
-                                    continue
-                            area = area_reg.async_get_area(area_id)
-                            if area is None:
-                                continue
-                            ressource = HIPRessource(
-                                state.domain,
-                                entity,
-                                state.name,
-                                area.name,
-                                state.attributes.get(ATTR_SUPPORTED_FEATURES, 0),
-                            )
-                            self.hip_ressources_by_entity_id[
-                                state.entity_id
-                            ] = ressource
-                            self.hip_ressources_by_entity_name[state.name] = ressource
-                            self._subscriptions.append(
-                                async_track_state_change_event(
-                                    self.hass,
-                                    [state.entity_id],
-                                    self._async_update_event_state_callback,
-                                )
-                            )
-                            self.handle_resource_state_data(
-                                state.entity_id, state, state.attributes
+                    area_by_device = {
+                        device.id: device.area_id
+                        for device in dr.async_get(self.hass).devices.values()
+                    }
+                    area_name_by_id = {
+                        area.id: area.name
+                        for area in ar.async_get(self.hass).async_list_areas()
+                    }
+                    components = {
+                        domain: self.hass.data.get(domain) for domain in HIP_DOMAINS
+                    }
+                    for state in self.hass.states.async_all(HIP_DOMAINS):
+                        if( self.include_exclude_mode == MODE_INCLUDE and state.entity_id not in self.include_entities ):
+                            continue
+                        if( self.include_exclude_mode == MODE_EXCLUDE and state.entity_id in self.exclude_entities ):
+                            continue
+                        if "?" in state.name or "/" in state.name:
+                            message = f"Entity {state.name} contains illegal character (? or /) for BeoLink usage"
+                            _LOGGER.info( message )
+                            continue
+                        component = components.get(state.domain)
+                        if component is None:
+                            continue
+                        entity = component.get_entity(state.entity_id)
+                        if entity is None or entity.registry_entry is None:
+                            continue
+                        area_id = entity.registry_entry.area_id or area_by_device.get(
+                            entity.registry_entry.device_id
+                        )
+                        if area_id is None:
+                            continue
+                        area_name = area_name_by_id.get(area_id)
+                        if area_name is None:
+                            continue
+                        ressource = HIPRessource(
+                            state.domain,
+                            entity,
+                            state.name,
+                            area_name,
+                            state.attributes.get(ATTR_SUPPORTED_FEATURES, 0),
+                        )
+                        self.hip_ressources_by_entity_id[
+                            state.entity_id
+                        ] = ressource
+                        self.hip_ressources_by_entity_name[state.name] = ressource
+                        self._subscriptions.append(
+                            async_track_state_change_event(
+                                self.hass,
+                                [state.entity_id],
+                                self._async_update_event_state_callback,
                             )
+                        )
+                        self.handle_resource_state_data(
+                            state.entity_id, state, state.attributes
+                        )
 
                 if line == "f */*/*/*":
                     self.send_ok_line("f */*/*/*")
@@ -366,17 +375,13 @@ class HIPServer(asyncio.Protocol):
                     hip_ressource = self.hip_ressources_by_entity_name[entity_name]
                     params = {ATTR_ENTITY_ID: hip_ressource.entity_id}
                     if ressource_type == "SHADE":
-                        if action == "RAISE":
-                            service = SERVICE_OPEN_COVER
-                        elif action == "LOWER":
-                            service = SERVICE_CLOSE_COVER
-                        elif action == "STOP":
-                            service = SERVICE_STOP_COVER
-                        elif action.startswith("SET"):
+                        if action.startswith("SET"):
                             service = SERVICE_SET_COVER_POSITION
                             qs = str(action).split("?")[1]
                             parameters = parse_qs(qs)
                             params[ATTR_POSITION] = parameters["LEVEL"][0]
+                        else:
+                            service = SHADE_SERVICES[action]
                         self.async_call_service(
                             hip_ressource.entity_id,
                             hip_ressource.entity_name,
@@ -1,39 +1,43 @@
+from dataclasses import dataclass, field
 import time
 
-class Installer(object):
-    def __init__(self) -> None:
-        self.name = ""
-        self.contact = ""
+@dataclass(slots=True)
+class Installer:
+    name: str = ""
+    contact: str = ""
 
 
-class Zone(object):
-    def __init__(self, name, icon, special, forbidden, resources) -> None:
-        self.name = name
-        self.icon = icon
-        self.special = special
-        self.forbidden = forbidden
-        self.resources = resources
+@dataclass(slots=True)
+class Zone:
+    name: str
+    icon: str
+    special: bool
+    forbidden: bool
+    resources: object
 
-class Area(object):
-    def __init__(self, name ) -> None:
-        self.name = name
+@dataclass(slots=True)
+class Area:
+    name: str
+    zones: list = field(default_factory=list)
 
-class blgwpwebservices(object):
-    def __init__(self, name, serial_number, areas) -> None:
-        self.timestamp = int(time.time())
-        self.port = 9100
-        self.sn = serial_number
-        self.project = name
-        self.installer = Installer()
-        self.version = 2
-        self.fwversion = "1.5.4.557"
-        self.units = {"temperature": "C"}
-        self.macroEdition = True
-        self.location = {
+@dataclass(slots=True, kw_only=True)
+class blgwpwebservices:
+    timestamp: int = field(default_factory=lambda: int(time.time()))
+    port: int = 9100
+    sn: str
+    project: str
+    installer: Installer = field(default_factory=Installer)
+    version: int = 2
+    fwversion: str = "1.5.4.557"
+    units: dict = field(default_factory=lambda: {"temperature": "C"})
+    macroEdition: bool = True
+    location: dict = field(
+        default_factory=lambda: {
             "centerlat": 0,
             "centerlon": 0,
             "radius": 0,
             "handler": "Main/global/SYSTEM/BLGW"
             #ToDo
         }
-        self.areas = areas
+    )
+    areas: list